@@ -1,7 +1,22 @@
+import argparse
+import atexit
+import bisect
+import csv
 import logging
-import psycopg2
-from datetime import datetime
+import logging.handlers
+import queue
 import sys
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta
+import threading
+import time
+import weakref
 import tkinter as tk
 from tkinter import messagebox
 import os
@@ -11,234 +26,543 @@ import tkinter.ttk as ttk
 from f_db_config import db_host, db_port, db_name, db_user, db_password
 
 
-today_date = datetime.today().date()
 log_dir = "my_timetracker/logs"
 
 # Create and configure logger
-logger = logging.getLogger(f"my_timetracker_log-{today_date}")
+logger = logging.getLogger("my_timetracker_log")
 logger.setLevel(logging.INFO)
 
-# Create file handler which logs even debug messages
-handler = logging.FileHandler(f"{log_dir}/my_timetracker_log-{today_date}.log")
+
+class RecordTimeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    # Records arrive in batches from the MemoryHandler below, so roll over on the time
+    # a record was created rather than when its batch is written. Otherwise a batch
+    # flushed just after midnight would put yesterday's records in today's file.
+    # The stdlib check then runs as before, keeping its guard against rolling over
+    # a non-regular file such as /dev/null
+    def shouldRollover(self, record):
+        return record.created >= self.rolloverAt and super().shouldRollover(record)
+
+
+class TimedMemoryHandler(logging.handlers.MemoryHandler):
+    # Also flush once the oldest buffered record is a few seconds old, which bounds
+    # what a crash or kill can lose
+    def shouldFlush(self, record):
+        return (
+            super().shouldFlush(record)
+            or record.created - self.buffer[0].created >= 5
+        )
+
+
+# Create file handler which logs even debug messages, rolling over at midnight
+# and opening the file only once the first record arrives
+handler = RecordTimeRotatingFileHandler(
+    f"{log_dir}/my_timetracker_log.log",
+    when="midnight",
+    backupCount=14,
+    delay=True,
+    encoding="utf-8",
+)
 
 # Create formatter and add it to the handlers
 formatter = logging.Formatter("%(name)s %(asctime)s %(levelname)s %(message)s")
 handler.setFormatter(formatter)
 
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats every record on the calling thread. The queue never
+    # leaves this process, so pass records through untouched and let the listener
+    # thread do the formatting
+    def prepare(self, record):
+        return record
+
+
+# Callers only enqueue records; a listener thread batches them into the file,
+# flushing every 64 records, every 5 seconds of buffered records or as soon as an
+# error is logged
+log_queue = queue.SimpleQueue()
+memory_handler = TimedMemoryHandler(
+    capacity=64, flushLevel=logging.ERROR, target=handler
+)
+listener = logging.handlers.QueueListener(
+    log_queue, memory_handler, respect_handler_level=True
+)
+listener.start()
+atexit.register(listener.stop)
+
 # Add the handler to the logger
-logger.addHandler(handler)
+logger.addHandler(DeferredQueueHandler(log_queue))
 
 
 logger.info("")
-logger.info(f" --- STARTING THE CUSTOM LOGGER FOR MY TIMETRACKER APPLICATION --- ")
+logger.info(" --- STARTING THE CUSTOM LOGGER FOR MY TIMETRACKER APPLICATION --- ")
+
+
+# SQL used by Database, built once at import. The hot statements are PREPAREd on
+# every pooled connection and then run by name through EXECUTE
+# TimerApp worker threads, the pool keeps this many connections open so overlapping
+# calls reuse prepared sessions instead of each connecting afresh
+DB_WORKERS = 4
+
+SQL_SET_PLAN_CACHE_MODE = "SET plan_cache_mode = force_custom_plan"
+# Prepared one by one, mtt_start_task last as only it depends on mtt_task_names
+SQL_PREPARE_STATEMENTS = {
+    "mtt_finish_task": """PREPARE mtt_finish_task (int, text) AS
+        UPDATE mtt_tasks
+        SET finish = CURRENT_TIMESTAMP
+        WHERE user_id = $1 AND task = $2 AND finish IS NULL""",
+    # DO UPDATE rather than DO NOTHING so RETURNING also yields existing ids
+    "mtt_upsert_user": """PREPARE mtt_upsert_user (text) AS
+        INSERT INTO mtt_users (username) VALUES ($1)
+        ON CONFLICT (username)
+        DO UPDATE SET username = EXCLUDED.username
+        RETURNING id""",
+    # The CTE records the task name in the same round trip as the insert, which is
+    # skipped while the same task is still running for the user
+    "mtt_start_task": """PREPARE mtt_start_task (int, text) AS
+        WITH new_name AS (
+            INSERT INTO mtt_task_names (task) VALUES ($2) ON CONFLICT DO NOTHING
+        )
+        INSERT INTO mtt_tasks (user_id, task, start)
+        SELECT $1, $2, CURRENT_TIMESTAMP
+        WHERE NOT EXISTS (
+            SELECT 1 FROM mtt_tasks
+            WHERE user_id = $1 AND task = $2 AND finish IS NULL
+        )""",
+}
+SQL_START_TASK = "EXECUTE mtt_start_task (%s, %s)"
+SQL_FINISH_TASK = "EXECUTE mtt_finish_task (%s, %s)"
+SQL_UPSERT_USER = "EXECUTE mtt_upsert_user (%s)"
+SQL_MTT_TABLES = """SELECT table_name
+    FROM information_schema.tables
+    WHERE table_schema = 'public' AND table_name LIKE 'mtt%'"""
+SQL_TASK_NAMES = "SELECT task FROM mtt_task_names"
+SQL_USERNAMES = "SELECT username FROM mtt_users"
+# Multi-row inserts for execute_values, RETURNING lets us count the rows written
+SQL_BULK_ADD_USERS = """INSERT INTO mtt_users (username) VALUES %s
+    ON CONFLICT (username) DO NOTHING
+    RETURNING id"""
+SQL_BULK_ADD_TASKS = """WITH added AS (
+        INSERT INTO mtt_tasks (user_id, task, start, finish) VALUES %s
+        RETURNING id, task
+    ), new_names AS (
+        INSERT INTO mtt_task_names (task)
+        SELECT DISTINCT task FROM added WHERE task IS NOT NULL
+        ON CONFLICT DO NOTHING
+    )
+    SELECT id FROM added"""
+# mtt_task_names holds one row per task name, so the task dropdown does not need a
+# DISTINCT over the whole task history. It is created and backfilled on first run
+SQL_TASK_NAMES_EXISTS = "SELECT to_regclass('mtt_task_names')"
+SQL_CREATE_TASK_NAMES = (
+    "CREATE TABLE IF NOT EXISTS mtt_task_names (task VARCHAR(50) PRIMARY KEY)"
+)
+SQL_BACKFILL_TASK_NAMES = """INSERT INTO mtt_task_names (task)
+    SELECT DISTINCT task FROM mtt_tasks WHERE task IS NOT NULL
+    ON CONFLICT DO NOTHING"""
+
+
+@lru_cache(maxsize=None)
+def create_table_query(table_name, columns_query):
+    # The column definitions are trusted DDL from this file, only the name is quoted
+    return sql.SQL("CREATE TABLE {} ({})").format(
+        sql.Identifier(table_name), sql.SQL(columns_query)
+    )
+
+
+@lru_cache(maxsize=None)
+def drop_table_query(table_name):
+    return sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table_name))
 
 
 class Database:
-    def __new__(cls, *args, **kwargs):
-        if not hasattr(cls, "instance"):
-            cls.instance = super().__new__(cls)
-        return cls.instance
-
     def __init__(self, host, port, db, user, pss):
         try:
-            self.con = psycopg2.connect(
-                host=host, port=port, database=db, user=user, password=pss
+            self._pool = ThreadedConnectionPool(
+                DB_WORKERS,
+                10,
+                host=host,
+                port=port,
+                database=db,
+                user=user,
+                password=pss,
+                # Fail a hung connect rather than tie up a worker indefinitely
+                connect_timeout=10,
             )
-            self.cur = self.con.cursor()
+            # Names of the statements prepared so far on each pooled connection
+            self._prepared = weakref.WeakKeyDictionary()
+            # Connection bound to the current thread by transaction()
+            self._local = threading.local()
+            # Dropdown values, fetched on first use and then kept up to date locally
+            self._username_cache = None
+            self._task_cache = None
             logger.info("Connected to database.")
         except Exception as e:
-            logger.error(f"Error connecting to database: {e}")
+            logger.error("Error connecting to database: %s", e)
             raise e  # Raise the exception for the GUI to handle
+        atexit.register(self.close)
+        # Once, from this thread, before any pooled connection prepares mtt_start_task
+        con = self._pool.getconn()
+        try:
+            self._ensure_task_names_table(con)
+        finally:
+            self._pool.putconn(con)
+
+    @contextmanager
+    def _connection(self):
+        # Borrow a pooled connection in autocommit mode and always hand it back.
+        # The session is configured once, when the connection is first seen
+        con = self._pool.getconn()
+        try:
+            prepared = self._prepared.get(con)
+            if prepared is None:
+                con.set_session(readonly=False, autocommit=True)
+                prepared = self._prepared[con] = set()
+                self._set_plan_cache_mode(con)
+            if len(prepared) < len(SQL_PREPARE_STATEMENTS):
+                self._prepare_statements(con, prepared)
+            yield con
+        finally:
+            self._pool.putconn(con, close=bool(con.closed))
+
+    @contextmanager
+    def transaction(self):
+        # Run the enclosed calls on one pooled connection and commit them together
+        # on exit, rolling everything back if any of them raises
+        if getattr(self._local, "con", None) is not None:
+            yield  # Nested: the outermost transaction commits
+            return
+        with self._connection() as con:
+            con.autocommit = False
+            self._local.con = con
+            try:
+                yield
+                con.commit()
+            except BaseException:
+                if not con.closed:
+                    con.rollback()
+                raise
+            finally:
+                self._local.con = None
+                if not con.closed:
+                    con.autocommit = True
+
+    @contextmanager
+    def _checkout(self):
+        # Reuse the current transaction's connection. Outside of one, the statement
+        # runs in autocommit, one round trip instead of BEGIN + statement + COMMIT
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            with con.cursor() as cur:
+                yield con, cur
+            return
+        with self._connection() as con:
+            with con.cursor() as cur:
+                yield con, cur
+
+    def _set_plan_cache_mode(self, con):
+        try:
+            with con.cursor() as cur:
+                cur.execute(SQL_SET_PLAN_CACHE_MODE)
+        except psycopg2.Error as e:
+            # plan_cache_mode only exists from PostgreSQL 12 on, keep the default plans
+            logger.warning("Could not set plan_cache_mode: %s", e)
+
+    def _prepare_statements(self, con, prepared):
+        # Parse and plan the hot queries once per connection, call sites EXECUTE them.
+        # Each PREPARE runs in autocommit on its own, so one failing leaves the others
+        # usable, and only the ones still missing are retried on the next checkout
+        for name, prepare_query in SQL_PREPARE_STATEMENTS.items():
+            if name in prepared:
+                continue
+            try:
+                with con.cursor() as cur:
+                    cur.execute(prepare_query)
+                prepared.add(name)
+            except psycopg2.Error as e:
+                logger.error("Error preparing statement '%s': %s", name, e)
+        if len(prepared) == len(SQL_PREPARE_STATEMENTS):
+            logger.info("Prepared statements created.")
+
+    def _ensure_task_names_table(self, con):
+        try:
+            with con.cursor() as cur:
+                cur.execute(SQL_TASK_NAMES_EXISTS)
+                if cur.fetchone()[0] is None:
+                    cur.execute(SQL_CREATE_TASK_NAMES)
+                    cur.execute(SQL_BACKFILL_TASK_NAMES)
+                    logger.info("Table 'mtt_task_names' created and backfilled.")
+            con.commit()
+        except psycopg2.Error as e:
+            logger.error("Error creating table 'mtt_task_names': %s", e)
+            con.rollback()
 
     def get_mtt_tables(self):
         try:
-            self.cur.execute(
-                """SELECT table_name
-                    FROM information_schema.tables
-                    WHERE table_schema = 'public' AND table_name LIKE 'mtt%'"""
-            )
-            tables = self.cur.fetchall()
-            logger.info(f"The database contains {len(tables)} 'mtt' tables: {tables}")
-            return tables
+            # Stream the rows through a server-side cursor, only the count is needed.
+            # Named cursors need a transaction, autocommit connections have none
+            with self.transaction(), self._checkout() as (con, _):
+                with con.cursor(name="mtt_tables_cur") as cur:
+                    cur.itersize = 256
+                    cur.execute(SQL_MTT_TABLES)
+                    count = sum(1 for _ in cur)
+            logger.info("The database contains %s 'mtt' tables.", count)
+            return count
         except psycopg2.Error as e:
-            logger.error(f"Error selecting tables from the database: {e}")
+            logger.error("Error selecting tables from the database: %s", e)
 
     def create_table(self, table_name, columns_query):
-        logger.info(f"Creating table '{table_name}'...")
+        logger.info("Creating table '%s'...", table_name)
         try:
-            create_table_query = f"""
-                CREATE TABLE {table_name} (
-                    {columns_query}
-                )
-            """
-            self.cur.execute(create_table_query)
-            self.con.commit()
-            logger.info(f"Table '{table_name}' created successfully!")
+            with self._checkout() as (con, cur):
+                cur.execute(create_table_query(table_name, columns_query))
+            logger.info("Table '%s' created successfully!", table_name)
         except psycopg2.errors.DuplicateTable:
-            logger.info(f"Table '{table_name}' already exists.")
+            logger.info("Table '%s' already exists.", table_name)
         except psycopg2.Error as er:
-            logger.error(f"Error creating table '{table_name}': {er}")
+            logger.error("Error creating table '%s': %s", table_name, er)
 
     def drop_table(self, table_name):
-        logger.info(f"Dropping table '{table_name}'...")
+        logger.info("Dropping table '%s'...", table_name)
         try:
-            drop_table_query = f"""
-            DROP TABLE IF EXISTS {table_name}
-            """
-            self.cur.execute(drop_table_query)
-            self.con.commit()
-            logger.info(f"Table '{table_name}' deleted!")
+            with self._checkout() as (con, cur):
+                cur.execute(drop_table_query(table_name))
+            logger.info("Table '%s' deleted!", table_name)
         except psycopg2.Error as er:
-            logger.error(f"Error deleting table '{table_name}': {er}")
+            logger.error("Error deleting table '%s': %s", table_name, er)
 
     def add_user(self, username):
+        return self.get_or_create_user(username)
+
+    def start_task(self, user_id, task_name):
         try:
-            max_id = self.get_max_user_id()
-            new_id = max_id + 1
-            insert_query = """INSERT INTO mtt_users (id, username) VALUES (%s, %s)"""
-            self.cur.execute(insert_query, (new_id, username))
-            self.con.commit()
-            logger.info(f"User '{username}' added successfully with ID {new_id}.")
-            return new_id
-        except psycopg2.errors.UniqueViolation:
-            logger.error(f"User '{username}' already exists.")
-            self.con.rollback()
+            with self._checkout() as (con, cur):
+                cur.execute(SQL_START_TASK, (user_id, task_name))
+                started = cur.rowcount == 1
+            if not started:
+                logger.error(
+                    "Task '%s' for user ID '%s' is already running.", task_name, user_id
+                )
+                return False
+            logger.info(
+                "Task '%s' for user ID '%s' started successfully.", task_name, user_id
+            )
+            tasks = self._task_cache
+            if tasks is not None and task_name not in tasks:
+                bisect.insort(tasks, task_name)
+            return True
         except psycopg2.Error as e:
-            logger.error(f"Error adding user '{username}': {e}")
-            self.con.rollback()
+            logger.error(
+                "Error starting task '%s' for user ID '%s': %s", task_name, user_id, e
+            )
         return None
 
-    def start_task(self, user_id, task_name):
+    def restart_task(self, user_id, task_name):
+        # Stop a run left open, e.g. by a crash, and start a new one in one commit
         try:
-            insert_query = """INSERT INTO mtt_tasks (user_id, task, start)
-                            VALUES (%s, %s, CURRENT_TIMESTAMP)"""
-            self.cur.execute(insert_query, (user_id, task_name))
-            self.con.commit()
+            with self.transaction(), self._checkout() as (con, cur):
+                cur.execute(SQL_FINISH_TASK, (user_id, task_name))
+                cur.execute(SQL_START_TASK, (user_id, task_name))
+                started = cur.rowcount == 1
+            if not started:
+                logger.error(
+                    "Task '%s' for user ID '%s' is already running.", task_name, user_id
+                )
+                return False
             logger.info(
-                f"Task '{task_name}' for user ID '{user_id}' started successfully."
+                "Task '%s' for user ID '%s' restarted successfully.", task_name, user_id
             )
-        except psycopg2.errors.UniqueViolation:
-            logger.error(f"Task '{task_name}' for user ID '{user_id}' already exists.")
-            self.con.rollback()
+            return True
         except psycopg2.Error as e:
             logger.error(
-                f"Error starting task '{task_name}' for user ID '{user_id}': {e}"
+                "Error restarting task '%s' for user ID '%s': %s", task_name, user_id, e
             )
-            self.con.rollback()
-            sys.exit()
+        return None
 
     def finish_task(self, user_id, task_name):
         try:
-            update_query = """UPDATE mtt_tasks
-                              SET finish = CURRENT_TIMESTAMP
-                              WHERE user_id = %s AND task = %s AND finish IS NULL"""
-            self.cur.execute(update_query, (user_id, task_name))
-            self.con.commit()
+            with self._checkout() as (con, cur):
+                cur.execute(SQL_FINISH_TASK, (user_id, task_name))
+                finished = cur.rowcount > 0
+            if not finished:
+                logger.error(
+                    "Task '%s' for user ID '%s' is not running.", task_name, user_id
+                )
+                return False
             logger.info(
-                f"Task '{task_name}' for user ID '{user_id}' finished successfully."
+                "Task '%s' for user ID '%s' finished successfully.", task_name, user_id
             )
+            return True
         except psycopg2.Error as e:
             logger.error(
-                f"Error finishing task '{task_name}' for user ID '{user_id}': {e}"
+                "Error finishing task '%s' for user ID '%s': %s", task_name, user_id, e
             )
-            self.con.rollback()
+        return None
 
-    def __del__(self):
+    def close(self):
+        if self._pool.closed:
+            return
         try:
-            self.cur.close()
-            self.con.close()
+            self._pool.closeall()
             logger.info("Database connection closed.")
         except Exception as e:
-            logger.error(f"Error closing database connection: {e}")
+            logger.error("Error closing database connection: %s", e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def get_or_create_user(self, username):
         try:
-            # Check if the user already exists in the database
-            self.cur.execute(
-                "SELECT id FROM mtt_users WHERE username = %s", (username,)
-            )
-            user_row = self.cur.fetchone()
-            if user_row:
-                user_id = user_row[0]
-                logger.info(f"User '{username}' already exists with ID '{user_id}'.")
-            else:
-                # If the user does not exist, add them to the database
-                user_id = self.add_user(username)
+            with self._checkout() as (con, cur):
+                # Insert the user or fetch the existing row's ID in a single round trip
+                cur.execute(SQL_UPSERT_USER, (username,))
+                user_id = cur.fetchone()[0]
+            usernames = self._username_cache
+            if usernames is not None and username not in usernames:
+                bisect.insort(usernames, username)
         except psycopg2.Error as e:
-            logger.error(f"Error getting or creating user '{username}': {e}")
-            self.con.rollback()
+            logger.error("Error getting or creating user '%s': %s", username, e)
             user_id = None
 
         return user_id
 
-    def get_max_user_id(self):
+    def bulk_add_users(self, usernames):
         try:
-            self.cur.execute("SELECT MAX(id) FROM mtt_users")
-            max_id = self.cur.fetchone()[0]
-            return max_id if max_id is not None else 0
+            # One commit for the whole import instead of one per page
+            with self.transaction(), self._checkout() as (con, cur):
+                added = execute_values(
+                    cur,
+                    SQL_BULK_ADD_USERS,
+                    [(username,) for username in usernames],
+                    page_size=500,
+                    fetch=True,
+                )
+            # Reload the dropdown list on next use rather than merging names by hand
+            self._username_cache = None
+            logger.info(
+                "Added %s of %s users, the rest already existed.",
+                len(added),
+                len(usernames),
+            )
+            return len(added)
+        except psycopg2.Error as e:
+            logger.error("Error bulk adding users: %s", e)
+            return None
+
+    def bulk_add_tasks(self, tasks):
+        # tasks are (user_id, task, start, finish) tuples
+        try:
+            with self.transaction(), self._checkout() as (con, cur):
+                added = execute_values(
+                    cur, SQL_BULK_ADD_TASKS, tasks, page_size=500, fetch=True
+                )
+            self._task_cache = None
+            logger.info("Added %s tasks.", len(added))
+            return len(added)
         except psycopg2.Error as e:
-            logger.error(f"Error fetching max user ID: {e}")
-            self.con.rollback()
-            return 0
+            logger.error("Error bulk adding tasks: %s", e)
+            return None
 
     def get_task_names(self):
+        if self._task_cache is not None:
+            return list(self._task_cache)
         try:
-            self.cur.execute("SELECT DISTINCT task FROM mtt_tasks")
-            tasks = self.cur.fetchall()
-            return [task[0] for task in tasks]
+            with self._checkout() as (con, cur):
+                cur.execute(SQL_TASK_NAMES)
+                tasks = cur.fetchall()
+            self._task_cache = sorted(task[0] for task in tasks if task[0] is not None)
+            return list(self._task_cache)
         except psycopg2.Error as e:
-            logger.error(f"Error fetching task names: {e}")
-            self.con.rollback()
+            logger.error("Error fetching task names: %s", e)
             return []
 
     def get_usernames(self):
+        if self._username_cache is not None:
+            return list(self._username_cache)
         try:
-            self.cur.execute("SELECT username FROM mtt_users")
-            usernames = self.cur.fetchall()
-            return [username[0] for username in usernames]
+            with self._checkout() as (con, cur):
+                cur.execute(SQL_USERNAMES)
+                usernames = cur.fetchall()
+            self._username_cache = sorted(
+                username[0] for username in usernames if username[0] is not None
+            )
+            return list(self._username_cache)
         except psycopg2.Error as e:
-            logger.error(f"Error fetching usernames: {e}")
-            self.con.rollback()
+            logger.error("Error fetching usernames: %s", e)
             return []
 
 
 class TimerApp:
-    def __init__(self, db):
+    def __init__(self, db=None):
         self.db = db
         self.root = tk.Tk()
         self.root.title("MyTimeTracker DMTT")
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        # Stay hidden until positioned, so the window doesn't flash at its default spot
+        self.root.withdraw()
 
         self.user_label = tk.Label(self.root, text="Username:")
-        self.user_label.pack()
         self.user_entry = ttk.Combobox(self.root)
-        self.user_entry.pack()
-        self.user_button = tk.Button(self.root, text="Submit", command=self.setup_user)
-        self.user_button.pack()
+        self.user_button = tk.Button(
+            self.root, text="Submit", command=self.setup_user, state=tk.DISABLED
+        )
 
         self.task_label = tk.Label(self.root, text="Task Name:")
-        self.task_label.pack()
         self.task_entry = ttk.Combobox(self.root)
-        self.task_entry.pack()
 
         self.start_button = tk.Button(
             self.root, text="Start Task", command=self.start_task, state=tk.DISABLED
         )
-        self.start_button.pack()
 
         self.timer_label = tk.Label(self.root, text="00:00:00")
-        self.timer_label.pack()
 
         self.stop_button = tk.Button(
             self.root, text="Stop Task", command=self.stop_task, state=tk.DISABLED
         )
-        self.stop_button.pack()
+
+        # Lay out all widgets in one pass once they exist
+        widgets = [
+            self.user_label,
+            self.user_entry,
+            self.user_button,
+            self.task_label,
+            self.task_entry,
+            self.start_button,
+            self.timer_label,
+            self.stop_button,
+        ]
+        for row, widget in enumerate(widgets):
+            widget.grid(row=row, column=0)
+        self.root.grid_columnconfigure(0, weight=1)
 
         self.timer_running = False
+        # The name the running task was started under, task_entry is locked meanwhile
+        self._task_name = None
         self.start_time = None
+        self._start_monotonic = None
         self.elapsed_time = 0
-
-        self.populate_usernames()
-        self.populate_tasknames()
+        self._after_id = None
+        self._last_text = "00:00:00"
+
+        # DB calls run on workers so round trips never block the Tk event loop, their
+        # finished futures are queued back and handled on this thread by _poll_done
+        self._exec = ThreadPoolExecutor(max_workers=DB_WORKERS)
+        self._done = queue.SimpleQueue()
+        self._pending = 0
+        self._polling = False
+        # In-flight writes, the only DB calls _on_close waits for
+        self._writes = set()
+
+        # Username dropdown state, loaded by _ensure_previous_usernames on first use
+        self._user_file = None
+        self.previous_usernames = None
+        self._user_lower_pairs = None
+        self._dropdown_job = None
+
+        if self.db is not None:
+            self.attach_db(self.db)
 
         # Set the width and height of the window
         window_width = 300
@@ -250,6 +574,57 @@ class TimerApp:
         y = (screen_height - window_height) // 2 - 40
         # Set the window geometry to appear in the center
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
+        self.root.deiconify()
+
+    def _submit(self, callback, fn, *args):
+        # Run fn on a worker, callback(future) is then called on the Tk thread
+        future = self._exec.submit(fn, *args)
+        future.add_done_callback(lambda f: self._done.put((callback, f)))
+        self._pending += 1
+        if not self._polling:
+            self._polling = True
+            self.root.after(50, self._poll_done)
+        return future
+
+    def _submit_write(self, callback, fn, *args):
+        future = self._submit(callback, fn, *args)
+        self._writes.add(future)
+        future.add_done_callback(self._writes.discard)
+        return future
+
+    def _poll_done(self):
+        # Only scheduled while DB calls are in flight
+        while not self._done.empty():
+            callback, future = self._done.get()
+            self._pending -= 1
+            try:
+                callback(future)
+            except Exception:
+                # Keep polling, the remaining calls still need their callbacks
+                logger.exception("Error handling the result of a database call")
+        if self._pending:
+            self.root.after(50, self._poll_done)
+        else:
+            self._polling = False
+
+    def connect(self):
+        self._submit(self._on_connected, _connect_db)
+
+    def _on_connected(self, future):
+        try:
+            db = future.result()
+        except Exception as e:
+            messagebox.showerror(
+                "Database Error", f"Could not connect to database: {e}"
+            )
+            return
+        self.attach_db(db)
+
+    def attach_db(self, db):
+        self.db = db
+        self.populate_usernames()
+        self.populate_tasknames()
+        self.user_button.config(state=tk.NORMAL)
 
     def start_task(self):
         task_name = self.task_entry.get()
@@ -257,50 +632,135 @@ class TimerApp:
             messagebox.showerror("Input Error", "Task name cannot be empty.")
             return
 
+        self.start_button.config(state=tk.DISABLED)
+        self.task_entry.config(state=tk.DISABLED)
+        self._submit_write(
+            lambda f: self._on_task_started(task_name, f),
+            self.db.start_task,
+            self.user_id,
+            task_name,
+        )
+
+    def _on_task_started(self, task_name, future):
+        started = future.result()
+        if started is False:
+            # An open row for this task is left over, e.g. from a crash
+            if messagebox.askyesno(
+                "Task Already Running",
+                f"Task '{task_name}' was started earlier and never stopped.\n\n"
+                "Stop that run now and start a new one?",
+            ):
+                self._submit_write(
+                    lambda f: self._on_task_started(task_name, f),
+                    self.db.restart_task,
+                    self.user_id,
+                    task_name,
+                )
+            else:
+                self.start_button.config(state=tk.NORMAL)
+                self.task_entry.config(state=tk.NORMAL)
+            return
+        if not started:
+            messagebox.showerror("Database Error", "Could not start task.")
+            self.start_button.config(state=tk.NORMAL)
+            self.task_entry.config(state=tk.NORMAL)
+            return
+
         self.start_time = datetime.now()
-        logger.info(f"Task '{task_name}' started at {self.start_time}")
+        self._start_monotonic = time.monotonic()
+        logger.info("Task '%s' started at %s", task_name, self.start_time)
 
-        self.db.start_task(self.user_id, task_name)
+        self._task_name = task_name
         self.timer_running = True
-        self.update_timer()  # Remove this line
-        self.start_button.config(state=tk.DISABLED)
+        self._tick()
         self.stop_button.config(state=tk.NORMAL)
+        # A new task name was added to the cache, offer it in the combobox
+        self.populate_tasknames()
 
     def stop_task(self):
         self.timer_running = False
-        elapsed_time = datetime.now() - self.start_time
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        elapsed_time = timedelta(seconds=time.monotonic() - self._start_monotonic)
         self.elapsed_time = elapsed_time.total_seconds()
-        self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
 
-        task_name = self.task_entry.get()
-        self.db.finish_task(self.user_id, task_name)
+        task_name = self._task_name
+        self._submit_write(
+            lambda f: self._on_task_finished(task_name, elapsed_time, f),
+            self.db.finish_task,
+            self.user_id,
+            task_name,
+        )
+
+    def _on_task_finished(self, task_name, elapsed_time, future):
+        finished = future.result()
+        self._task_name = None
+        self.start_button.config(state=tk.NORMAL)
+        self.task_entry.config(state=tk.NORMAL)
+        if finished is None:
+            messagebox.showerror("Database Error", f"Could not stop task '{task_name}'.")
+            return
+        if not finished:
+            messagebox.showwarning(
+                "Task Not Running",
+                f"Task '{task_name}' had no open run to stop, nothing was recorded.",
+            )
+            return
 
-        logger.info(f"Task '{task_name}' stopped after {self.elapsed_time} seconds")
+        logger.info("Task '%s' stopped after %s seconds", task_name, self.elapsed_time)
         messagebox.showinfo("Task Completed", f"Task completed in {str(elapsed_time)}.")
 
-    def update_timer(self):
-        if self.timer_running:
-            elapsed_time = datetime.now() - self.start_time
-            hours, remainder = divmod(elapsed_time.seconds, 3600)
+    def _tick(self):
+        elapsed = time.monotonic() - self._start_monotonic
+        # Nothing to redraw while the window is minimised
+        if self.timer_label.winfo_viewable():
+            hours, remainder = divmod(int(elapsed), 3600)
             minutes, seconds = divmod(remainder, 60)
             time_string = f"{hours:02}:{minutes:02}:{seconds:02}"
-            self.timer_label.config(text=time_string)
-            self.root.after(1000, self.update_timer)
+            if time_string != self._last_text:
+                self.timer_label.config(text=time_string)
+                self._last_text = time_string
+        if self.timer_running:
+            # Wake up just after the next whole second so the display never drifts
+            delay_ms = 1000 - int(elapsed * 1000) % 1000
+            self._after_id = self.root.after(delay_ms, self._tick)
+
+    def _ensure_previous_usernames(self):
+        # The dropdown is not bound to any widget yet, so nothing is opened at start up
+        if self.previous_usernames is not None:
+            return
+        try:
+            # Read once, new names are appended through the handle kept open from here
+            self._user_file = open("previous_usernames.txt", "a+")
+        except OSError as e:
+            logger.warning("Could not open previous_usernames.txt: %s", e)
+            self.previous_usernames = []
+        else:
+            self.previous_usernames = self.load_previous_usernames()
+        # Lowered once per name and interned, as many names share their lowered form
+        self._user_lower_pairs = [
+            (username, sys.intern(username.lower()))
+            for username in self.previous_usernames
+        ]
 
     def load_previous_usernames(self):
-        filename = "previous_usernames.txt"
-        if os.path.exists(filename):
-            with open(filename, "r") as file:
-                return [line.strip() for line in file.readlines()]
-        return []
+        self._user_file.seek(0)
+        # dict.fromkeys drops repeats while keeping the file order
+        return list(dict.fromkeys(line.strip() for line in self._user_file))
 
     def save_username(self, username):
-        filename = "previous_usernames.txt"
-        with open(filename, "a") as file:
-            file.write(username + "\n")
+        self._ensure_previous_usernames()
+        if self._user_file is not None:
+            self._user_file.write(username + "\n")
+            self._user_file.flush()
+        if username not in self.previous_usernames:
+            self.previous_usernames.append(username)
+            self._user_lower_pairs.append((username, sys.intern(username.lower())))
 
     def show_dropdown(self, event):
+        self._ensure_previous_usernames()
         if self.previous_usernames:
             self.listbox.delete(0, tk.END)
             for username in self.previous_usernames:
@@ -312,11 +772,19 @@ class TimerApp:
             )
 
     def update_dropdown(self, event):
-        search_term = self.user_entry.get()
+        # Debounce: only filter once typing pauses for 150 ms
+        if self._dropdown_job is not None:
+            self.root.after_cancel(self._dropdown_job)
+        self._dropdown_job = self.root.after(150, self._apply_dropdown_filter, event)
+
+    def _apply_dropdown_filter(self, event):
+        self._dropdown_job = None
+        self._ensure_previous_usernames()
+        search_term = self.user_entry.get().lower()
         matching_usernames = [
             username
-            for username in self.previous_usernames
-            if search_term.lower() in username.lower()
+            for username, username_lower in self._user_lower_pairs
+            if search_term in username_lower
         ]
         self.listbox.delete(0, tk.END)
         for username in matching_usernames:
@@ -343,52 +811,161 @@ class TimerApp:
             messagebox.showerror("Input Error", "Username cannot be empty.")
             return
 
-        user_id = self.db.get_or_create_user(username)
+        self.user_button.config(state=tk.DISABLED)
+        self._submit_write(
+            lambda f: self._on_user_set_up(username, f),
+            self.db.get_or_create_user,
+            username,
+        )
+
+    def _on_user_set_up(self, username, future):
+        user_id = future.result()
         if user_id is not None:
             self.user_id = user_id
             self.user_entry.config(state=tk.DISABLED)
-            self.user_button.config(state=tk.DISABLED)
             self.start_button.config(state=tk.NORMAL)
-            logger.info(f"User '{username}' set up with ID '{self.user_id}'.")
+            logger.info("User '%s' set up with ID '%s'.", username, self.user_id)
+            # Served from the cache, picks up a newly created username
+            self.populate_usernames()
         else:
             messagebox.showerror("Database Error", "Could not set up user.")
+            self.user_button.config(state=tk.NORMAL)
 
     def populate_usernames(self):
-        usernames = self.db.get_usernames()
-        self.user_entry["values"] = usernames
+        self._submit(self._on_usernames, self.db.get_usernames)
 
-    def populate_tasknames(self):
-        tasknames = self.db.get_task_names()
-        self.task_entry["values"] = tasknames
+    def _on_usernames(self, future):
+        self.user_entry["values"] = future.result()
 
-    def run(self):
-        self.root.mainloop()
-
-
-db = Database(db_host, db_port, db_name, db_user, db_password)
+    def populate_tasknames(self):
+        self._submit(self._on_tasknames, self.db.get_task_names)
 
-db.get_mtt_tables()
+    def _on_tasknames(self, future):
+        self.task_entry["values"] = future.result()
 
-# db.create_table(
-#     "mtt_users",
-#     "id SERIAL PRIMARY KEY, username VARCHAR(50) UNIQUE, email VARCHAR(50) UNIQUE",
-# )
+    def _on_close(self):
+        if self.timer_running:
+            # Closing the window stops the task, so no open row is left behind
+            self.timer_running = False
+            self._submit_write(
+                lambda f: None, self.db.finish_task, self.user_id, self._task_name
+            )
+        # Let in-flight writes (e.g. a pending finish_task) land, but don't hang the
+        # window on reads or a connect that is still waiting on the server
+        wait(self._writes, timeout=5)
+        self._exec.shutdown(wait=False, cancel_futures=True)
+        if self.db is not None:
+            self.db.close()
+        if self._user_file is not None:
+            self._user_file.close()
+        self.root.destroy()
 
-# db.create_table(
-#     "mtt_tasks",
-#     """id SERIAL PRIMARY KEY,
-#         user_id INT,
-#         task VARCHAR(50),
-#         start TIMESTAMP,
-#         finish TIMESTAMP,
-#         constraint fk_users
-#             foreign key (user_id)
-#             references mtt_users(id)""",
-# )
+    def run(self):
+        self.root.mainloop()
 
-# db.drop_table('mtt_tasks')
-# db.drop_table('mtt_users')
 
-# Start the TimerApp
-app = TimerApp(db)
-app.run()
+@lru_cache(maxsize=1)
+def get_db():
+    # One Database, and so one connection pool, per process
+    return Database(db_host, db_port, db_name, db_user, db_password)
+
+
+def _connect_db():
+    # Runs on a TimerApp worker so the window shows while the connection is made
+    db = get_db()
+    # The catalog lookup is only informative, keep it off the normal launch path
+    if os.environ.get("MTT_DEBUG"):
+        db.get_mtt_tables()
+
+    # db.create_table(
+    #     "mtt_users",
+    #     "id SERIAL PRIMARY KEY, username VARCHAR(50) UNIQUE, email VARCHAR(50) UNIQUE",
+    # )
+
+    # db.create_table(
+    #     "mtt_tasks",
+    #     """id SERIAL PRIMARY KEY,
+    #         user_id INT,
+    #         task VARCHAR(50),
+    #         start TIMESTAMP,
+    #         finish TIMESTAMP,
+    #         constraint fk_users
+    #             foreign key (user_id)
+    #             references mtt_users(id)""",
+    # )
+
+    # db.drop_table('mtt_tasks')
+    # db.drop_table('mtt_users')
+
+    return db
+
+
+def _read_usernames(path):
+    with open(path, "r", encoding="utf-8-sig") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def _read_tasks(path):
+    # Checked up front so a malformed file is reported before anything is inserted
+    tasks = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as file:
+        reader = csv.reader(file)
+        for row in reader:
+            if not row:
+                continue
+            if reader.line_num == 1 and row[0].strip().lower() == "user_id":
+                continue
+            if len(row) != 4:
+                raise ValueError(
+                    f"{path}:{reader.line_num}: expected 4 columns "
+                    f"(user_id,task,start,finish), got {len(row)}"
+                )
+            if not row[0].strip().isdigit():
+                raise ValueError(
+                    f"{path}:{reader.line_num}: user_id {row[0]!r} is not a number"
+                )
+            # An empty finish column means the task is still running
+            tasks.append(tuple(value.strip() or None for value in row))
+    return tasks
+
+
+parser = argparse.ArgumentParser(description="MyTimeTracker DMTT")
+parser.add_argument(
+    "--import-users",
+    metavar="FILE",
+    help="add the usernames listed one per line in FILE and exit",
+)
+parser.add_argument(
+    "--import-tasks",
+    metavar="FILE",
+    help="add the tasks in CSV FILE (user_id,task,start,finish) and exit",
+)
+args = parser.parse_args()
+
+if args.import_users or args.import_tasks:
+    try:
+        usernames = _read_usernames(args.import_users) if args.import_users else None
+        tasks = _read_tasks(args.import_tasks) if args.import_tasks else None
+    except (OSError, ValueError) as e:
+        sys.exit(f"Import failed: {e}")
+
+    try:
+        db = get_db()
+    except psycopg2.Error as e:
+        sys.exit(f"Import failed: could not connect to database: {e}")
+    with db:
+        if usernames is not None:
+            added = db.bulk_add_users(usernames)
+            if added is None:
+                sys.exit("Import failed: could not add users, see the log for details")
+            print(f"Imported {added} of {len(usernames)} users.")
+        if tasks is not None:
+            added = db.bulk_add_tasks(tasks)
+            if added is None:
+                sys.exit("Import failed: could not add tasks, see the log for details")
+            print(f"Imported {added} of {len(tasks)} tasks.")
+else:
+    # Start the TimerApp, the DB buttons are enabled once the connection is up
+    app = TimerApp()
+    app.connect()
+    app.run()